@@ -0,0 +1,53 @@
+import json, threading, time
+from pathlib import Path
+from typing import Dict, Any, Generator, Union
+
+CAPTURE_VERSION = 1
+
+class CaptureWriter:
+    """
+    Append-only traffic capture (JSONL, one frame per line).
+    - First line written by a writer is a header: {"capture":1,"role":"host"|"gui","t0":<wall clock>}
+    - Every frame: {"t":<monotonic secs>,"d":"in"|"out","peer":"...","msg":{...}}
+    Safe to call record() from the reader thread and the sender concurrently.
+    """
+    def __init__(self, path: Union[str, Path], role: str):
+        self.path = Path(path)
+        self.role = role
+        self.lock = threading.Lock()
+        self.f = open(self.path, "a", encoding="utf-8")
+        self._write({"capture": CAPTURE_VERSION, "role": role, "t0": time.time(), "m0": time.monotonic()})
+
+    def record(self, direction: str, peer: str, msg: Dict[str, Any]) -> None:
+        self._write({"t": time.monotonic(), "d": direction, "peer": peer, "msg": msg})
+
+    def close(self) -> None:
+        with self.lock:
+            if not self.f.closed:
+                self.f.close()
+
+    def _write(self, rec: Dict[str, Any]) -> None:
+        line = json.dumps(rec, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.f.closed:
+                return
+            self.f.write(line)
+            self.f.flush()
+
+
+def read_capture(path: Union[str, Path]) -> Generator[Dict[str, Any], None, None]:
+    """
+    Yields capture records in file order. Header lines are yielded too (they carry "capture");
+    a file may hold several sessions appended one after another.
+    A truncated last line (writer killed mid-write) is ignored.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                break
+
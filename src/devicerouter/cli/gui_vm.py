@@ -1,9 +1,12 @@
 import argparse, json, os, sys
 from pathlib import Path
 
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 
 from devicerouter.gui.app_qt5 import App
+from devicerouter.capture import CaptureWriter
+from devicerouter.profiling import add_trace_args, start_from_args
 
 DEFAULT_LISTEN_PORT = 7000
 
@@ -13,6 +16,8 @@ def build_parser():
     p.add_argument("--test-file", type=str, help="TEST MODE: use this JSON file as transport")
     p.add_argument("--combo-width", type=int, help="Fixed width of the combo widget (px)")
     p.add_argument("--popup-width", type=int, help="Minimum width of the dropdown list popup (px)")
+    p.add_argument("--record", type=str, help="Append every inbound/outbound frame to this capture file")
+    add_trace_args(p)
     return p
 
 def main():
@@ -20,19 +25,31 @@ def main():
     app = QApplication(sys.argv)
 
     use_file = bool(args.test_file)
+    # In vsock mode VsockServer calls App.on_msg / on_ack on its reader thread.
+    prof = start_from_args(args, role="gui", threaded=not use_file)
+    if prof:
+        # cProfile must be stopped on the thread it runs on: the Qt main thread
+        QTimer.singleShot(int(prof.seconds * 1000), prof.stop)
     test_path = Path(args.test_file) if args.test_file else None
     if use_file and not test_path.exists():
         test_path.write_text(json.dumps({"devices": {}, "current-mount": {}}, indent=2))
 
+    capture = CaptureWriter(args.record, role="gui") if args.record else None
     w = App(
         use_file_transport=use_file,
         my_port=args.port,
         test_file=test_path,
         combo_width=args.combo_width,
-        popup_width=args.popup_width
+        popup_width=args.popup_width,
+        capture=capture
     )
     w.show()
-    sys.exit(app.exec_())
+    rc = app.exec_()
+    if prof:
+        prof.stop()
+    if capture:
+        capture.close()
+    sys.exit(rc)
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,32 @@
-import argparse, json, sys, time
+import argparse, json, signal, sys, time
 from devicerouter.host.service import HostService
 from devicerouter.schema import normalize_schema
+from devicerouter.capture import CaptureWriter
+from devicerouter.profiling import add_trace_args, start_from_args
+from devicerouter.host.executor import NullExecutor, QmpExecutor
+from devicerouter.host.fakeqmp import start_fake_fleet
+
+def add_executor_args(p):
+    p.add_argument("--executor", choices=["none", "qmp"], default="none",
+                   help="How devices are moved: none (bookkeeping only) or qmp (usb-host via QMP)")
+    p.add_argument("--qmp-socket", type=str, help="QMP socket path template, e.g. /run/qemu/{vm}.qmp")
+    p.add_argument("--fake-qmp", action="store_true", help="Serve every permitted VM from a local fake QMP server")
+    p.add_argument("--fake-qmp-latency", type=float, default=0.0, help="Seconds the fake QMP takes per operation")
+    p.add_argument("--max-concurrency", type=int, default=4, help="Device operations running at once (default 4)")
+
+def make_executor(args, schema):
+    """Returns (executor, fake servers to stop on exit)."""
+    if args.executor != "qmp":
+        return NullExecutor(), []
+    servers = []
+    template = args.qmp_socket
+    if args.fake_qmp:
+        vms = [vm for meta in schema["devices"].values() for vm in meta.get("permitted_vms", [])]
+        template, servers = start_fake_fleet(vms, latency=args.fake_qmp_latency)
+        print(f"[HOST] Fake QMP for {len(servers)} VMs at {template}")
+    if not template:
+        raise SystemExit("--executor qmp needs --qmp-socket or --fake-qmp")
+    return QmpExecutor(template), servers
 
 def build_parser():
     p = argparse.ArgumentParser(description="Host ↔ GUI VM (vsock) using JSON schema snapshot")
@@ -8,22 +34,39 @@ def build_parser():
     p.add_argument("--guest-cid", type=int, required=True, help="GUI VM guest CID (e.g., 101)")
     p.add_argument("--guest-port", type=int, default=7000, help="GUI VM vsock listen port (default 7000)")
     p.add_argument("--ack-delay", type=float, default=0.0, help="Simulated seconds before ACK")
+    p.add_argument("--record", type=str, help="Append every inbound/outbound frame to this capture file")
+    add_executor_args(p)
+    add_trace_args(p)
     return p
 
 def main():
     args = build_parser().parse_args()
+    # Stopped as a service: unwind through finally/atexit so profile and trace get written.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
     with open(args.schema_json, "r") as f:
         schema = normalize_schema(json.load(f))
-    svc = HostService(schema, args.guest_cid, args.guest_port, ack_delay=args.ack_delay)
+    prof = start_from_args(args, role="host", threaded=True)
+    capture = CaptureWriter(args.record, role="host") if args.record else None
+    executor, fakes = make_executor(args, schema)
+    svc = HostService(schema, args.guest_cid, args.guest_port, ack_delay=args.ack_delay, capture=capture,
+                      executor=executor, max_concurrency=args.max_concurrency)
     svc.start()
     try:
         print("[HOST] Running. Ctrl+C to exit.")
         while True:
             time.sleep(1.0)
+            if prof and prof.due():
+                prof.stop()
     except KeyboardInterrupt:
         pass
     finally:
         svc.stop()
+        if prof:
+            prof.stop()
+        for srv in fakes:
+            srv.stop()
+        if capture:
+            capture.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,69 @@
+import argparse, contextlib, json, os, sys
+
+from devicerouter.replay import load_frames, first_snapshot, replay, format_report, HostTarget, gui_target
+from devicerouter.schema import normalize_schema
+from devicerouter.cli.host import add_executor_args, make_executor
+from devicerouter.profiling import add_trace_args, start_from_args
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Replay a traffic capture into the host or a headless GUI")
+    p.add_argument("capture", help="Capture file written with --record")
+    p.add_argument("--target", choices=["host", "gui"], default="host", help="Side to feed (default host)")
+    p.add_argument("--speed", type=float, default=1.0, help="Pacing factor: 1 = recorded, N = N times faster, 0 = max")
+    p.add_argument("--repeat", type=int, default=1, help="Replay the capture this many times")
+    p.add_argument("--schema-json", type=str, help="Host schema (default: first snapshot in the capture)")
+    p.add_argument("--quiet", action="store_true", help="Silence the target's own output while replaying")
+    add_executor_args(p)
+    add_trace_args(p)
+    return p
+
+def main():
+    args = build_parser().parse_args()
+    frames = load_frames(args.capture, args.target)
+    if not frames:
+        print(f"[REPLAY] no frames for target '{args.target}' in {args.capture}")
+        sys.exit(1)
+
+    fakes = []
+    if args.target == "host":
+        if args.schema_json:
+            with open(args.schema_json, "r") as f:
+                schema = normalize_schema(json.load(f))
+        else:
+            schema = first_snapshot(args.capture)
+            if schema is None:
+                print("[REPLAY] capture has no snapshot; pass --schema-json")
+                sys.exit(1)
+            schema = normalize_schema(schema)
+        executor, fakes = make_executor(args, schema)
+    else:
+        gui = gui_target()
+
+    # Host operations run on DeviceQueue workers; the GUI target stays on the main thread.
+    prof = start_from_args(args, role="replay", threaded=args.target == "host")
+    stats = {}
+    out = open(os.devnull, "w") if args.quiet else sys.stdout
+    with contextlib.redirect_stdout(out):
+        for _ in range(max(1, args.repeat)):
+            if args.target == "host":
+                # Fresh service and VM state each pass, or later passes replay a different workload.
+                for srv in fakes:
+                    srv.reset()
+                handler = HostTarget(schema, executor=executor, max_concurrency=args.max_concurrency)
+            else:
+                handler = gui
+            for t, d in replay(frames, handler, speed=args.speed).items():
+                stats.setdefault(t, []).extend(d)
+            if args.target == "host":
+                handler.close()
+    if args.target == "host":
+        executor.close()
+    if prof:
+        prof.stop()
+    for srv in fakes:
+        srv.stop()
+    print(f"[REPLAY] {len(frames)} frames x{max(1, args.repeat)} -> {args.target} (speed {args.speed or 'max'})")
+    print(format_report(stats))
+
+if __name__ == "__main__":
+    main()
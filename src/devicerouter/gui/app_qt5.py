@@ -5,19 +5,23 @@ from typing import Dict, Any, Optional
 from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QMessageBox, QScrollArea
+    QMessageBox, QLineEdit, QListView, QAbstractItemView
 )
 
+from devicerouter import trace
 from devicerouter.gui.registry import Registry
-from devicerouter.gui.widgets import make_device_block, SELECT_LABEL
+from devicerouter.gui.widgets import DeviceListModel, DeviceFilterProxy, DeviceDelegate, SELECT_LABEL
 from devicerouter.transports.vsock import VsockServer
 from devicerouter.transports.filetest import FileTestTransport
+from devicerouter.capture import CaptureWriter
 
 ACK_TIMEOUT_MS = 6000
+_NO_MOUNT = object()  # ack without a "mounted" field (test mode, older hosts)
 
 class App(QWidget):
     def __init__(self, use_file_transport: bool, my_port: int,
-                 test_file: Optional[Path], combo_width: Optional[int], popup_width: Optional[int]):
+                 test_file: Optional[Path], combo_width: Optional[int], popup_width: Optional[int],
+                 capture: Optional[CaptureWriter] = None):
         super().__init__()
         self.setWindowTitle("Device Router (GUI VM - Qt5)")
         self.resize(760, 560)
@@ -26,24 +30,36 @@ class App(QWidget):
         self.registry = Registry()
         self.pending: Dict[str, Dict[str, Any]] = {}
         self.host_connected = False
-        self.combo_width = combo_width
-        self.popup_width = popup_width
 
-        # device_id -> widgets
-        self.block_by_device: Dict[str, QWidget] = {}
-        self.combo_by_device: Dict[str, QWidget] = {}
+        # Device list: one model row per device, filtered through the proxy, painted by the delegate
+        self.model = DeviceListModel(self.registry, on_change=self.on_combo_changed,
+                                     is_pending=self._is_device_pending)
+        self.proxy = DeviceFilterProxy()
+        self.proxy.setSourceModel(self.model)
 
         # --------- UI ---------
         root = QVBoxLayout(self)
 
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.inner = QWidget()
-        self.devices_layout = QVBoxLayout(self.inner)
-        self.devices_layout.setSpacing(12)
-        self.devices_layout.addStretch(1)
-        self.scroll.setWidget(self.inner)
-        root.addWidget(self.scroll)
+        filter_row = QHBoxLayout()
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter: vendor, product, vid:pid or VM")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.textChanged.connect(self.apply_filter)
+        filter_row.addWidget(self.filter_edit)
+        self.count_lbl = QLabel("")
+        self.count_lbl.setStyleSheet("color: gray;")
+        filter_row.addWidget(self.count_lbl)
+        root.addLayout(filter_row)
+
+        self.view = QListView()
+        self.view.setModel(self.proxy)
+        self.view.setItemDelegate(DeviceDelegate(combo_width, popup_width, self.view))
+        self.view.setUniformItemSizes(True)
+        self.view.setSpacing(6)
+        self.view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.view.setEditTriggers(QAbstractItemView.EditKeyPressed)
+        self.view.clicked.connect(self.view.edit)
+        root.addWidget(self.view)
 
         status_row = QHBoxLayout()
         self.status_lbl = QLabel("Status: initializing…")
@@ -73,7 +89,8 @@ class App(QWidget):
                 emit_message=self.on_msg,
                 emit_connected=self.on_connected,
                 emit_disconnected=self.on_disconnected,
-                emit_ack=self.on_ack
+                emit_ack=self.on_ack,
+                capture=capture
             )
             self.transport.start()
         else:
@@ -81,62 +98,23 @@ class App(QWidget):
                 on_message=self.on_msg,
                 on_connect=self.on_connected,
                 on_disconnect=self.on_disconnected,
-                my_port=my_port
+                my_port=my_port,
+                capture=capture
             )
             self.transport.start()
 
-    # ---------- building / updating blocks ----------
-    def _add_or_update_block(self, device_id: str, info: Dict[str, Any]):
-        container = self.block_by_device.get(device_id)
-        if container is None:
-            container = make_device_block(
-                device_id, info,
-                on_change=self.on_combo_changed,
-                combo_width=self.combo_width,
-                popup_width=self.popup_width
-            )
-            # Insert above the final stretch
-            self.devices_layout.insertWidget(self.devices_layout.count()-1, container)
-            self.block_by_device[device_id] = container
-            self.combo_by_device[device_id] = container._combo
-        else:
-            # Update title and combo items
-            lbl = getattr(container, "_label", None)
-            if lbl:
-                from devicerouter.gui.widgets import device_title_html
-                lbl.setText(device_title_html(device_id, info.get("vendor",""), info.get("product","")))
-            combo = getattr(container, "_combo", None)
-            if combo:
-                combo.blockSignals(True)
-                items = [SELECT_LABEL] + info.get("targets", [])
-                combo.clear()
-                combo.addItems(items)
-                sel = info.get("selected")
-                idx = 0 if not sel or sel not in info.get("targets", []) else (info["targets"].index(sel) + 1)
-                combo.setCurrentIndex(idx)
-                combo.blockSignals(False)
-
-    def _remove_block(self, device_id: str):
-        w = self.block_by_device.pop(device_id, None)
-        self.combo_by_device.pop(device_id, None)
-        if w:
-            w.setParent(None)
-            w.deleteLater()
+    # ---------- filtering ----------
+    def apply_filter(self, *_):
+        """Show only devices matching the filter text (the proxy re-filters only if the hits changed)."""
+        query = self.filter_edit.text()
+        self.proxy.set_matches(self.registry.search(query) if query.strip() else None)
+        total, shown = self.model.rowCount(), self.proxy.rowCount()
+        self.count_lbl.setText(f"{shown} / {total}" if shown != total else f"{total} devices")
 
     # ---------- helpers ----------
     def _is_device_pending(self, device_id: str) -> bool:
         return any(p.get("device_id") == device_id for p in self.pending.values())
 
-    def _set_combo_choice(self, device_id: str, choice: Optional[str]):
-        combo = self.combo_by_device.get(device_id)
-        info = self.registry.devices.get(device_id, {})
-        targets = info.get("targets", [])
-        idx = 0 if not choice or choice not in targets else (targets.index(choice) + 1)
-        if combo:
-            combo.blockSignals(True)
-            combo.setCurrentIndex(idx)
-            combo.blockSignals(False)
-
     # ---------- transport events ----------
     def on_connected(self):
         self.host_connected = True
@@ -147,6 +125,10 @@ class App(QWidget):
         self.status_lbl.setText("Status: disconnected / waiting")
 
     def on_msg(self, msg: Dict[str, Any]):
+        with trace.span("gui.on_msg", type=msg.get("type"), request_id=msg.get("request_id")):
+            self._handle_msg(msg)
+
+    def _handle_msg(self, msg: Dict[str, Any]):
         if msg.get("type") == "snapshot":
             devices = msg.get("devices", {}) or {}
             mounts = msg.get("current-mount", {}) or {}
@@ -155,8 +137,8 @@ class App(QWidget):
             current_ids = set(self.registry.devices.keys())
             new_ids = set(devices.keys())
             for rem_id in (current_ids - new_ids):
-                self._remove_block(rem_id)
-                self.registry.devices.pop(rem_id, None)
+                self._cancel_pending(rem_id)
+                self.registry.remove(rem_id)
 
             # add/update
             for dev_id, meta in devices.items():
@@ -164,98 +146,145 @@ class App(QWidget):
                 vendor = meta.get("Vendor") or ""
                 product = meta.get("Product") or ""
                 selected = mounts.get(dev_id)
-                self.registry.devices[dev_id] = {
+                self.registry.put(dev_id, {
                     "targets": permitted,
                     "selected": selected,
                     "connected_to": selected,
                     "vendor": vendor,
                     "product": product,
-                }
-                self._add_or_update_block(dev_id, self.registry.devices[dev_id])
+                })
+            self.model.set_devices(list(devices))
+            self.apply_filter()
+
+        elif msg.get("type") == "device_removed":
+            dev_id = msg.get("device_id")
+            self._cancel_pending(dev_id)
+            self.model.remove(dev_id)
+            self.registry.remove(dev_id)
+            self.apply_filter()
 
         elif msg.get("type") == "ack":
-            self.on_ack(msg.get("request_id",""), msg.get("status","error"), msg.get("message",""))
+            self.on_ack(msg.get("request_id",""), msg.get("status","error"), msg.get("message",""),
+                        device_id=msg.get("device_id"), mounted=msg.get("mounted", _NO_MOUNT))
 
     def _start_pending(self, device_id: str, request_id: str, prev_choice: Optional[str], simulate_immediate_ok: bool):
-        combo = self.combo_by_device.get(device_id)
         if simulate_immediate_ok:
             self.on_ack(request_id, "ok", "")
             return
-        if combo:
-            combo.setEnabled(False)
         timer = QTimer(self)
         timer.setSingleShot(True)
         def on_to():
-            if combo:
-                combo.setEnabled(True)
-            QMessageBox.critical(self, "Timeout", f"{device_id}: no ACK from host")
-            self.registry.devices[device_id]["selected"] = prev_choice
-            self._set_combo_choice(device_id, prev_choice)
+            trace.request_end(request_id, status="timeout")
+            # Pop before the modal dialog so an ack arriving meanwhile is treated as late.
             self.pending.pop(request_id, None)
+            self.registry.devices[device_id]["selected"] = prev_choice
+            self.model.refresh(device_id)
+            QMessageBox.critical(self, "Timeout", f"{device_id}: no ACK from host yet; "
+                                 "the list will follow the host if it completes later.")
         timer.timeout.connect(on_to)
         timer.start(ACK_TIMEOUT_MS)
         self.pending[request_id] = {"device_id": device_id, "timer": timer, "prev_choice": prev_choice}
+        self.model.refresh(device_id)  # row is not editable while pending
 
-    def send_selection_or_change(self, device_id: str, target_vm: str, kind: str):
+    def _cancel_pending(self, device_id: str):
+        """Drop a device's pending requests and stop their timers; a late ack for them is ignored."""
+        for rid in [r for r, p in self.pending.items() if p.get("device_id") == device_id]:
+            p = self.pending.pop(rid)
+            if p.get("timer"):
+                p["timer"].stop()
+            trace.request_end(rid, status="cancelled")
+
+    def send_selection_or_change(self, device_id: str, target_vm: str, kind: str) -> str:
         prev = self.registry.devices[device_id].get("connected_to")
         req = str(uuid.uuid4())
+        trace.request_begin(req, device_id=device_id, target_vm=target_vm, kind=kind)
         self.registry.devices[device_id]["selected"] = target_vm
         simulate = hasattr(self.transport, "sync_from_registry")  # FileTestTransport has this
         self._start_pending(device_id, req, prev, simulate)
         try:
-            self.transport.send({
-                "type": "selection" if kind == "select" else "connect_change",
-                "request_id": req,
-                "device_id": device_id,
-                "target_vm": target_vm,
-                "ts": time.time()
-            })
+            with trace.span("gui.send", request_id=req):
+                self.transport.send({
+                    "type": "selection" if kind == "select" else "connect_change",
+                    "request_id": req,
+                    "device_id": device_id,
+                    "target_vm": target_vm,
+                    "ts": time.time()
+                })
             if simulate:  # test mode—apply immediately
-                self.registry.devices[device_id]["connected_to"] = target_vm
+                self.registry.set_connected(device_id, target_vm)
+                self.apply_filter()  # mounted VM is part of what the filter matches
         except Exception as e:
             QMessageBox.critical(self, "Send error", f"Failed to send: {e}")
+        return req
+
+    def on_ack(self, request_id: str, status: str, message: str,
+               device_id: Optional[str] = None, mounted: Any = _NO_MOUNT):
+        with trace.span("gui.ack_apply", request_id=request_id, status=status):
+            self._apply_ack(request_id, status, message, device_id, mounted)
 
-    def on_ack(self, request_id: str, status: str, message: str):
+    def _apply_mount(self, device_id: str, vm: Optional[str]):
+        """Adopt the host's view of where a device is mounted."""
+        if device_id not in self.registry.devices:
+            return
+        self.registry.devices[device_id]["selected"] = vm
+        self.registry.set_connected(device_id, vm)
+        self.model.refresh(device_id)
+        self.apply_filter()  # mounted VM is part of what the filter matches
+
+    def _apply_ack(self, request_id: str, status: str, message: str,
+                   device_id: Optional[str], mounted: Any):
         p = self.pending.pop(request_id, None)
         if not p:
+            # Late ack (we timed out and reverted): the host's mount still wins.
+            if device_id and mounted is not _NO_MOUNT and not self._is_device_pending(device_id):
+                self._apply_mount(device_id, mounted)
             return
+        trace.request_end(request_id, status=status)
         device_id = p["device_id"]
         if p.get("timer"):
             p["timer"].stop()
-        combo = self.combo_by_device.get(device_id)
-        if combo:
-            combo.setEnabled(True)
-        if status == "ok":
+        self.model.refresh(device_id)
+        if mounted is not _NO_MOUNT:
+            self._apply_mount(device_id, mounted)
+            if status != "ok":
+                QMessageBox.critical(self, "Host error", f"{device_id}: {message or 'error'}")
+        elif status == "ok":
             sel = self.registry.devices[device_id].get("selected")
-            self.registry.devices[device_id]["connected_to"] = sel
+            self.registry.set_connected(device_id, sel)
+            self.apply_filter()  # mounted VM is part of what the filter matches
         else:
             prev = p.get("prev_choice")
             self.registry.devices[device_id]["selected"] = prev
-            self._set_combo_choice(device_id, prev)
+            self.model.refresh(device_id)
             QMessageBox.critical(self, "Host error", f"{device_id}: {message or 'error'}")
 
     # ---------- UI events ----------
-    def on_combo_changed(self, device_id: str, _index: int):
+    def on_combo_changed(self, device_id: str, choice: str):
+        with trace.span("gui.combo_change", device_id=device_id) as sp:
+            req = self._handle_combo_change(device_id, choice)
+            if req:
+                sp.set(request_id=req)
+
+    def _handle_combo_change(self, device_id: str, choice: str) -> Optional[str]:
+        """Returns the request_id if a request was sent."""
         if self._is_device_pending(device_id):
-            info = self.registry.devices.get(device_id, {})
-            self._set_combo_choice(device_id, info.get("selected"))
+            self.model.refresh(device_id)
             QMessageBox.information(self, "Please wait", f"{device_id}: request already pending.")
             return
-        combo = self.combo_by_device.get(device_id)
-        if not combo:
+        if device_id not in self.registry.devices:
             return
-        choice = combo.currentText()
         if choice == SELECT_LABEL:
             self.registry.devices[device_id]["selected"] = None
             return
         info = self.registry.devices.get(device_id, {})
         connected = info.get("connected_to")
         if connected and connected != choice:
-            self.send_selection_or_change(device_id, choice, kind="change")
+            return self.send_selection_or_change(device_id, choice, kind="change")
         elif not connected:
-            self.send_selection_or_change(device_id, choice, kind="select")
+            return self.send_selection_or_change(device_id, choice, kind="select")
         else:
             self.registry.devices[device_id]["selected"] = choice
+        return None
 
     def on_save_clicked(self):
         # Only meaningful in test mode
@@ -1,4 +1,6 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set
+
+from devicerouter.gui.search import SearchIndex
 
 class Registry:
     """
@@ -9,10 +11,31 @@ class Registry:
         'vendor': Optional[str],
         'product': Optional[str],
     }
+    Add/remove devices and change 'connected_to' through the methods below so
+    the search index stays in sync.
     """
     def __init__(self):
         self.devices: Dict[str, Dict[str, Any]] = {}
+        self.index = SearchIndex()
 
     def clear(self):
         self.devices.clear()
+        self.index.clear()
+
+    def put(self, device_id: str, info: Dict[str, Any]):
+        self.devices[device_id] = info
+        self.index.update(device_id, info)
+
+    def remove(self, device_id: str):
+        self.devices.pop(device_id, None)
+        self.index.remove(device_id)
+
+    def set_connected(self, device_id: str, vm: Optional[str]):
+        info = self.devices.get(device_id)
+        if info is None:
+            return
+        info["connected_to"] = vm
+        self.index.update(device_id, info)
 
+    def search(self, query: str) -> Set[str]:
+        return self.index.search(query)
@@ -0,0 +1,122 @@
+import re
+from typing import Dict, Any, Iterable, Optional, Set
+
+_WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+PREFIX_LEN = 2   # terms shorter than NGRAM match word prefixes
+NGRAM = 3        # longer terms match anywhere (substring), via trigrams
+
+def searchable_text(device_id: str, info: Dict[str, Any]) -> str:
+    # vendor, product, vid:pid and currently mounted VM
+    parts = [device_id, info.get("vendor") or "", info.get("product") or "", info.get("connected_to") or ""]
+    return " ".join(parts).lower()
+
+
+class SearchIndex:
+    """
+    Incremental filter over devices.
+    - Terms of >= 3 chars: trigram posting lists, intersected, then verified by substring.
+    - Terms of 1-2 chars: prefix lists of each word (vendor "Logitech" is found by "l" and "lo").
+    Every whitespace-separated term must match. A query that extends the previous one
+    is intersected with the previous hits instead of starting over.
+    """
+    def __init__(self):
+        self.text: Dict[str, str] = {}
+        self.grams: Dict[str, Set[str]] = {}
+        self.prefixes: Dict[str, Set[str]] = {}
+        self._last_query: Optional[str] = None
+        self._last_hits: Set[str] = set()
+
+    def __len__(self):
+        return len(self.text)
+
+    def update(self, device_id: str, info: Dict[str, Any]) -> None:
+        text = searchable_text(device_id, info)
+        if self.text.get(device_id) == text:
+            return
+        self.remove(device_id)
+        self.text[device_id] = text
+        for g in self._grams(text):
+            self.grams.setdefault(g, set()).add(device_id)
+        for p in self._prefixes(text):
+            self.prefixes.setdefault(p, set()).add(device_id)
+        self._last_query = None
+
+    def remove(self, device_id: str) -> None:
+        text = self.text.pop(device_id, None)
+        if text is None:
+            return
+        for g in self._grams(text):
+            self._discard(self.grams, g, device_id)
+        for p in self._prefixes(text):
+            self._discard(self.prefixes, p, device_id)
+        self._last_query = None
+
+    def clear(self) -> None:
+        self.text.clear()
+        self.grams.clear()
+        self.prefixes.clear()
+        self._last_query = None
+
+    def search(self, query: str) -> Set[str]:
+        """device_ids matching every term of query; an empty query matches everything."""
+        q = " ".join(query.lower().split())
+        if not q:
+            return set(self.text)
+        terms = q.split(" ")
+        if self._refines(q):
+            # Only previous hits can still match; look up just the grown/new terms.
+            hits = self._last_hits
+            terms = terms[len(self._last_query.split(" ")) - 1:]
+        else:
+            hits = None
+        for term in terms:
+            cand = self._candidates(term)
+            hits = cand if hits is None else hits & cand
+            if not hits:
+                break
+        hits = hits or set()
+        self._last_query, self._last_hits = q, hits
+        return set(hits)
+
+    # ---- helpers ----
+    def _refines(self, q: str) -> bool:
+        last = self._last_query
+        if not last or not q.startswith(last):
+            return False
+        # A short (prefix) term growing into a long (substring) one may match more, not less.
+        old = last.split(" ")
+        grown = q.split(" ")[len(old) - 1]
+        return not (len(old[-1]) < NGRAM <= len(grown))
+
+    def _candidates(self, term: str) -> Set[str]:
+        if len(term) < NGRAM:
+            return set(self.prefixes.get(term, ()))
+        lists = []
+        for g in {term[i:i + NGRAM] for i in range(len(term) - NGRAM + 1)}:
+            s = self.grams.get(g)
+            if not s:
+                return set()
+            lists.append(s)
+        lists.sort(key=len)
+        cand = set(lists[0]).intersection(*lists[1:])
+        return {d for d in cand if term in self.text[d]}
+
+    @staticmethod
+    def _words(text: str) -> Iterable[str]:
+        return [w for w in _WORD_SPLIT.split(text) if w]
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+    @classmethod
+    def _prefixes(cls, text: str) -> Set[str]:
+        return {w[:n] for w in cls._words(text) for n in range(1, PREFIX_LEN + 1) if len(w) >= n}
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, device_id: str) -> None:
+        s = index.get(key)
+        if s is not None:
+            s.discard(device_id)
+            if not s:
+                del index[key]
@@ -1,18 +1,23 @@
 from functools import partial
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Callable
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel, QRect, QSize, QTimer
 from PyQt5.QtWidgets import (
-    QLabel, QComboBox, QVBoxLayout, QFrame
+    QApplication, QComboBox, QStyle, QStyledItemDelegate, QStyleOptionComboBox, QStyleOptionViewItem,
+    QAbstractItemDelegate
 )
 
 SELECT_LABEL = "Select"
 
-def device_title_html(device_id: str, vendor: str, product: str) -> str:
-    # Bold: Vendor (Product) [vid:pid]:
+DeviceIdRole = Qt.UserRole
+TargetsRole = Qt.UserRole + 1
+ChoiceRole = Qt.UserRole + 2   # current dropdown text: selected VM or SELECT_LABEL
+
+def device_title(device_id: str, vendor: str, product: str) -> str:
+    # Vendor (Product) [vid:pid]:
     v = vendor or ""
     p = product or ""
-    return f"<b>{v} ({p}) [{device_id}]:</b>"
+    return f"{v} ({p}) [{device_id}]:"
 
 def make_combo(device_id: str, targets: List[str], selected: Optional[str],
                on_change, combo_width: Optional[int] = None, popup_width: Optional[int] = None) -> QComboBox:
@@ -41,24 +46,174 @@ def make_combo(device_id: str, targets: List[str], selected: Optional[str],
     combo.currentIndexChanged.connect(partial(on_change, device_id))
     return combo
 
-def make_device_block(device_id: str, info: Dict[str, Any],
-                      on_change, combo_width: Optional[int], popup_width: Optional[int]) -> QFrame:
-    container = QFrame()
-    container.setFrameShape(QFrame.NoFrame)
-    v = QVBoxLayout(container)
-    v.setSpacing(6)
 
-    lbl = QLabel()
-    lbl.setTextFormat(Qt.RichText)
-    lbl.setTextInteractionFlags(Qt.TextSelectableByMouse)
-    lbl.setText(device_title_html(device_id, info.get("vendor",""), info.get("product","")))
-    v.addWidget(lbl)
+# ---------- device list (model/view) ----------
+class DeviceListModel(QAbstractListModel):
+    """
+    One row per device, backed by the Registry; no widgets per device.
+    on_change(device_id, choice) is called when the user picks a dropdown entry.
+    Rows of devices with a pending request are not editable.
+    """
+    def __init__(self, registry, on_change: Callable[[str, str], None], is_pending: Callable[[str], bool]):
+        super().__init__()
+        self.registry = registry
+        self.on_change = on_change
+        self.is_pending = is_pending
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        device_id = self.ids[index.row()]
+        if role == DeviceIdRole:
+            return device_id
+        info = self.registry.devices.get(device_id, {})
+        if role == Qt.DisplayRole:
+            return device_title(device_id, info.get("vendor", ""), info.get("product", ""))
+        if role == TargetsRole:
+            return info.get("targets", [])
+        if role == ChoiceRole:
+            sel = info.get("selected")
+            return sel if sel and sel in info.get("targets", []) else SELECT_LABEL
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if self.is_pending(self.ids[index.row()]):
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        if value == self.data(index, ChoiceRole):
+            return False  # editor closed without picking something else
+        self.on_change(self.ids[index.row()], value)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def set_devices(self, device_ids: List[str]):
+        """Replace all rows at once (snapshot)."""
+        self.beginResetModel()
+        self.ids = list(device_ids)
+        self.rows = {d: i for i, d in enumerate(self.ids)}
+        self.endResetModel()
+
+    def remove(self, device_id: str):
+        row = self.rows.get(device_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.ids[row]
+        self.rows = {d: i for i, d in enumerate(self.ids)}
+        self.endRemoveRows()
+
+    def refresh(self, device_id: str):
+        """Repaint a device's row after its registry entry or pending state changed."""
+        row = self.rows.get(device_id)
+        if row is not None:
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx)
+
+
+class DeviceFilterProxy(QSortFilterProxyModel):
+    """Shows the rows whose device_id is in matches; matches=None shows all."""
+    def __init__(self):
+        super().__init__()
+        self.matches: Optional[Set[str]] = None
+        self.setDynamicSortFilter(False)  # the App re-filters when searchable fields change
+
+    def set_matches(self, matches: Optional[Set[str]]):
+        if matches == self.matches:
+            return
+        self.matches = matches
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        # Called once per source row on every re-filter; keep it to a lookup.
+        return self.matches is None or self.sourceModel().ids[source_row] in self.matches
+
+
+class DeviceDelegate(QStyledItemDelegate):
+    """
+    Paints each row as the bold title with a dropdown below; the real QComboBox
+    (make_combo) only exists while a row is being edited.
+    """
+    PAD = 4
+    SPACING = 6
+
+    def __init__(self, combo_width: Optional[int] = None, popup_width: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self.combo_width = combo_width
+        self.popup_width = popup_width
+
+    def _style(self, option):
+        return option.widget.style() if option.widget else QApplication.style()
+
+    def _combo_option(self, option, index) -> QStyleOptionComboBox:
+        cb = QStyleOptionComboBox()
+        if option.widget:
+            cb.initFrom(option.widget)
+        cb.currentText = index.data(ChoiceRole) or SELECT_LABEL
+        cb.state = QStyle.State_Enabled if index.flags() & Qt.ItemIsEnabled else QStyle.State_None
+        fm = option.fontMetrics
+        items = [SELECT_LABEL] + list(index.data(TargetsRole) or [])
+        text_w = max((fm.horizontalAdvance(s) for s in items), default=80)
+        size = self._style(option).sizeFromContents(QStyle.CT_ComboBox, cb, QSize(text_w, fm.height()), option.widget)
+        top = option.rect.top() + self.PAD + fm.height() + self.SPACING
+        cb.rect = QRect(option.rect.left() + self.PAD, top, self.combo_width or size.width(), size.height())
+        return cb
+
+    def paint(self, painter, option, index):
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        title, opt.text = opt.text, ""
+        style = self._style(opt)
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+
+        painter.save()
+        font = painter.font()
+        font.setBold(True)
+        painter.setFont(font)
+        r = opt.rect.adjusted(self.PAD, self.PAD, -self.PAD, 0)
+        r.setHeight(opt.fontMetrics.height())
+        painter.drawText(r, Qt.AlignLeft | Qt.AlignVCenter, painter.fontMetrics().elidedText(title, Qt.ElideRight, r.width()))
+        painter.restore()
+
+        cb = self._combo_option(opt, index)
+        style.drawComplexControl(QStyle.CC_ComboBox, cb, painter, opt.widget)
+        style.drawControl(QStyle.CE_ComboBoxLabel, cb, painter, opt.widget)
+
+    def sizeHint(self, option, index):
+        cb = self._combo_option(option, index)
+        h = self.PAD + option.fontMetrics.height() + self.SPACING + cb.rect.height() + self.PAD
+        return QSize(cb.rect.width() + 2 * self.PAD, h)
+
+    def createEditor(self, parent, option, index):
+        combo = make_combo(index.data(DeviceIdRole), list(index.data(TargetsRole) or []), None,
+                           on_change=lambda *_: self._commit(combo),
+                           combo_width=self.combo_width, popup_width=self.popup_width)
+        combo.setParent(parent)
+        # Opening a row for edit is a click on its dropdown: show the list right away.
+        QTimer.singleShot(0, combo.showPopup)
+        return combo
+
+    def setEditorData(self, editor, index):
+        editor.blockSignals(True)
+        editor.setCurrentText(index.data(ChoiceRole) or SELECT_LABEL)
+        editor.blockSignals(False)
 
-    combo = make_combo(device_id, info.get("targets", []), info.get("selected"),
-                       on_change=on_change, combo_width=combo_width, popup_width=popup_width)
-    v.addWidget(combo)
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.EditRole)
 
-    container._label = lbl
-    container._combo = combo
-    return container
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(self._combo_option(option, index).rect)
 
+    def _commit(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor, QAbstractItemDelegate.NoHint)
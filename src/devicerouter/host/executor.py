@@ -0,0 +1,147 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from devicerouter.host.qmp import QmpPool, QmpError
+
+class PartialOpError(Exception):
+    """
+    An operation failed after it had already changed where the device is.
+    `mounted` is the VM the device is on now (None = detached everywhere),
+    `op` what effectively happened ("detach", "none", ...).
+    """
+    def __init__(self, message: str, mounted: Optional[str], op: str):
+        super().__init__(message)
+        self.mounted = mounted
+        self.op = op
+
+
+class Executor:
+    """
+    Moves USB devices between VMs. Methods block until the operation is done
+    and raise on failure; HostService turns the exception into an error ack.
+    Raise PartialOpError when the failure left the device somewhere else than before.
+    """
+    def attach(self, device_id: str, vm: str) -> None:
+        raise NotImplementedError
+
+    def detach(self, device_id: str, vm: str) -> None:
+        raise NotImplementedError
+
+    def move(self, device_id: str, src_vm: str, dst_vm: str) -> None:
+        self.detach(device_id, src_vm)
+        try:
+            self.attach(device_id, dst_vm)
+        except Exception as e:
+            # Already gone from src_vm: put it back there if possible.
+            try:
+                self.attach(device_id, src_vm)
+            except Exception as e2:
+                raise PartialOpError(f"attach to '{dst_vm}' failed: {e}; re-attach to '{src_vm}' failed: {e2}",
+                                     mounted=None, op="detach") from e
+            raise PartialOpError(f"attach to '{dst_vm}' failed: {e}; restored to '{src_vm}'",
+                                 mounted=src_vm, op="none") from e
+
+    def close(self) -> None:
+        pass
+
+
+class NullExecutor(Executor):
+    """Does nothing; the router only bookkeeps (previous behaviour)."""
+    def attach(self, device_id: str, vm: str) -> None:
+        pass
+
+    def detach(self, device_id: str, vm: str) -> None:
+        pass
+
+
+def qdev_id(device_id: str) -> str:
+    # "1a86:7523" -> "usb-1a86-7523" (QEMU ids may not contain ':')
+    return "usb-" + device_id.replace(":", "-")
+
+
+class QmpExecutor(Executor):
+    """
+    usb-host passthrough via QMP device_add / device_del, one pooled connection per VM.
+    detach waits for DEVICE_DELETED so a following attach elsewhere finds the device free.
+    """
+    def __init__(self, socket_template: str, timeout: float = 5.0, detach_timeout: float = 10.0):
+        self.pool = QmpPool(socket_template, timeout=timeout)
+        self.detach_timeout = detach_timeout
+
+    def attach(self, device_id: str, vm: str) -> None:
+        vid, pid = device_id.split(":", 1)
+        args = {"driver": "usb-host", "id": qdev_id(device_id),
+                "vendorid": int(vid, 16), "productid": int(pid, 16)}
+        self.pool.run(vm, lambda c: c.execute("device_add", args))
+
+    def detach(self, device_id: str, vm: str) -> None:
+        qid = qdev_id(device_id)
+        def op(c):
+            try:
+                c.execute("device_del", {"id": qid})
+            except QmpError as e:
+                if e.cls == "DeviceNotFound":
+                    return  # already gone
+                raise
+            try:
+                c.wait_event("DEVICE_DELETED", lambda d: d.get("device") == qid, self.detach_timeout)
+            except TimeoutError as e:
+                # device_del was accepted: the device is leaving vm even if the event is late.
+                raise PartialOpError(f"{e} (device_del accepted on '{vm}')", mounted=None, op="detach") from e
+        self.pool.run(vm, op)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class DeviceQueue:
+    """
+    Runs jobs on a bounded thread pool. Jobs submitted for the same key
+    (device_id) run one at a time, in submission order.
+    After shutdown() nothing new runs: submit() drops the job and returns False.
+    """
+    def __init__(self, max_workers: int = 4):
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="devicerouter-exec")
+        self.cond = threading.Condition()
+        self.queues: Dict[str, deque] = {}
+        self.closed = False
+
+    def submit(self, key: str, fn: Callable[[], None]) -> bool:
+        # pool.submit happens under cond so it cannot race with shutdown().
+        with self.cond:
+            if self.closed:
+                return False
+            q = self.queues.get(key)
+            if q is not None:
+                q.append(fn)
+                return True
+            self.queues[key] = deque()
+            self.pool.submit(self._run, key, fn)
+            return True
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.queues, timeout)
+
+    def shutdown(self) -> None:
+        """Drops queued jobs and waits for the running ones to finish."""
+        with self.cond:
+            self.closed = True
+            for q in self.queues.values():
+                q.clear()
+        self.pool.shutdown(wait=True)
+
+    def _run(self, key: str, fn: Callable[[], None]) -> None:
+        try:
+            fn()
+        except Exception as e:
+            print(f"[HOST] job for {key} failed: {e}")
+        with self.cond:
+            q = self.queues[key]
+            if not q:
+                del self.queues[key]
+                self.cond.notify_all()
+                return
+            self.pool.submit(self._run, key, q.popleft())
@@ -0,0 +1,128 @@
+import json, os, socket, tempfile, threading, time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+class FakeQmpServer(threading.Thread):
+    """
+    Minimal QMP server on AF_UNIX for tests and benchmarks (no QEMU needed).
+    Understands qmp_capabilities, device_add and device_del; attached devices are in .devices.
+    device_del answers immediately and emits DEVICE_DELETED after `latency`,
+    like QEMU does once the guest releases the device.
+    """
+    def __init__(self, path: str, latency: float = 0.0):
+        super().__init__(daemon=True)
+        self.path = path
+        self.latency = latency
+        self.devices: Dict[str, Dict[str, Any]] = {}  # qdev id -> device_add arguments
+        self.lock = threading.Lock()
+        self.stop_flag = threading.Event()
+        self.ready = threading.Event()
+        self.sock: Optional[socket.socket] = None
+
+    def run(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        self.sock.listen(8)
+        self.sock.settimeout(0.5)
+        self.ready.set()
+        while not self.stop_flag.is_set():
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def reset(self):
+        """Forget attached devices (e.g. between benchmark passes)."""
+        with self.lock:
+            self.devices.clear()
+
+    def stop(self):
+        self.stop_flag.set()
+        if self.sock:
+            try: self.sock.close()
+            except: pass
+        try: os.unlink(self.path)
+        except: pass
+
+    # ---- per-connection ----
+    def _serve(self, conn: socket.socket):
+        wlock = threading.Lock()
+        def send(obj):
+            with wlock:
+                conn.sendall((json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8"))
+        try:
+            send({"QMP": {"version": {"qemu": {"major": 8, "minor": 0, "micro": 0}, "package": "fake"},
+                          "capabilities": []}})
+            buf = b""
+            while not self.stop_flag.is_set():
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                buf += chunk
+                while b"\n" in buf:
+                    line, buf = buf.split(b"\n", 1)
+                    if line.strip():
+                        self._handle(json.loads(line.decode("utf-8")), send)
+        except OSError:
+            pass
+        finally:
+            try: conn.close()
+            except: pass
+
+    def _handle(self, req: Dict[str, Any], send):
+        cmd = req.get("execute")
+        args = req.get("arguments") or {}
+        reply: Dict[str, Any] = {"id": req.get("id")} if "id" in req else {}
+        if cmd == "qmp_capabilities":
+            reply["return"] = {}
+        elif cmd == "device_add":
+            qid = args.get("id")
+            with self.lock:
+                dup = qid in self.devices
+                if not dup:
+                    self.devices[qid] = dict(args)
+            if dup:
+                reply["error"] = {"class": "GenericError", "desc": f"Duplicate device ID '{qid}'"}
+            else:
+                if self.latency > 0:
+                    time.sleep(self.latency)
+                reply["return"] = {}
+        elif cmd == "device_del":
+            qid = args.get("id")
+            with self.lock:
+                found = self.devices.pop(qid, None) is not None
+            if not found:
+                reply["error"] = {"class": "DeviceNotFound", "desc": f"Device '{qid}' not found"}
+            else:
+                reply["return"] = {}
+                threading.Thread(target=self._deleted_later, args=(qid, send), daemon=True).start()
+        else:
+            reply["error"] = {"class": "CommandNotFound", "desc": f"The command {cmd} has not been found"}
+        send(reply)
+
+    def _deleted_later(self, qid: str, send):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        now = time.time()
+        try:
+            send({"event": "DEVICE_DELETED", "data": {"device": qid, "path": f"/machine/peripheral/{qid}"},
+                  "timestamp": {"seconds": int(now), "microseconds": int((now % 1) * 1e6)}})
+        except OSError:
+            pass
+
+
+def start_fake_fleet(vms: Iterable[str], latency: float = 0.0) -> Tuple[str, List[FakeQmpServer]]:
+    """One FakeQmpServer per VM in a temp dir. Returns (socket template, servers)."""
+    d = tempfile.mkdtemp(prefix="devicerouter-fakeqmp-")
+    servers = []
+    for vm in sorted(set(vms)):
+        srv = FakeQmpServer(os.path.join(d, f"{vm}.qmp"), latency=latency)
+        srv.start()
+        servers.append(srv)
+    for srv in servers:
+        srv.ready.wait(2.0)
+    return os.path.join(d, "{vm}.qmp"), servers
@@ -0,0 +1,142 @@
+import json, socket, threading, time
+from collections import deque
+from typing import Callable, Dict, Any, Optional
+
+class QmpError(Exception):
+    """QMP answered a command with {"error": {...}}."""
+    def __init__(self, cls: str, desc: str):
+        super().__init__(f"{cls}: {desc}")
+        self.cls = cls
+        self.desc = desc
+
+
+class QmpConnection:
+    """
+    One QMP session over AF_UNIX (line-delimited JSON).
+    Not thread-safe by itself; QmpPool hands it to one caller at a time.
+    Events that arrive while waiting for a reply are kept for wait_event().
+    """
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self.sock: Optional[socket.socket] = None
+        self.buf = b""
+        self.events: deque = deque(maxlen=256)
+        self._next_id = 0
+
+    def connect(self) -> "QmpConnection":
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(self.timeout)
+        s.connect(self.path)
+        self.sock = s
+        greeting = self._read_msg()
+        if "QMP" not in greeting:
+            self.close()
+            raise ConnectionError(f"{self.path}: not a QMP greeting: {greeting}")
+        self.execute("qmp_capabilities")
+        return self
+
+    def close(self):
+        if self.sock:
+            try: self.sock.close()
+            except: pass
+            self.sock = None
+        self.buf = b""
+
+    def execute(self, cmd: str, args: Optional[Dict[str, Any]] = None) -> Any:
+        self._next_id += 1
+        req: Dict[str, Any] = {"execute": cmd, "id": self._next_id}
+        if args:
+            req["arguments"] = args
+        self.sock.sendall((json.dumps(req, separators=(",", ":")) + "\n").encode("utf-8"))
+        while True:
+            msg = self._read_msg()
+            if "event" in msg:
+                self.events.append(msg)
+                continue
+            if msg.get("id") != self._next_id:
+                continue
+            if "error" in msg:
+                err = msg["error"] or {}
+                raise QmpError(err.get("class", "GenericError"), err.get("desc", ""))
+            return msg.get("return")
+
+    def wait_event(self, name: str, match: Callable[[Dict[str, Any]], bool], timeout: float) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        while True:
+            for ev in list(self.events):
+                if ev.get("event") == name and match(ev.get("data") or {}):
+                    self.events.remove(ev)
+                    return ev
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise TimeoutError(f"{self.path}: no {name} event within {timeout}s")
+            self.sock.settimeout(left)
+            try:
+                msg = self._read_msg()
+            except socket.timeout:
+                # socket.timeout is only an alias of TimeoutError from Python 3.10 on.
+                raise TimeoutError(f"{self.path}: no {name} event within {timeout}s")
+            finally:
+                self.sock.settimeout(self.timeout)
+            if "event" in msg:
+                self.events.append(msg)
+
+    def _read_msg(self) -> Dict[str, Any]:
+        while b"\n" not in self.buf:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError(f"{self.path}: QMP connection closed")
+            self.buf += chunk
+        line, self.buf = self.buf.split(b"\n", 1)
+        line = line.strip()
+        return json.loads(line.decode("utf-8")) if line else self._read_msg()
+
+
+class _Slot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conn: Optional[QmpConnection] = None
+
+
+class QmpPool:
+    """
+    Persistent QMP connections, one per VM, opened lazily.
+    socket_template is formatted with {vm}, e.g. "/run/qemu/{vm}.qmp".
+    Calls for the same VM are serialized on its connection; different VMs run in parallel.
+    """
+    def __init__(self, socket_template: str, timeout: float = 5.0):
+        self.socket_template = socket_template
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.slots: Dict[str, _Slot] = {}
+
+    def run(self, vm: str, fn: Callable[[QmpConnection], Any]) -> Any:
+        with self.lock:
+            slot = self.slots.setdefault(vm, _Slot())
+        with slot.lock:
+            # A pooled connection may have gone stale (VM restarted); retry once on a fresh one.
+            for attempt in (0, 1):
+                reused = slot.conn is not None
+                if slot.conn is None:
+                    slot.conn = QmpConnection(self.socket_template.format(vm=vm), self.timeout).connect()
+                try:
+                    return fn(slot.conn)
+                except QmpError:
+                    raise
+                except Exception as e:
+                    # Session state is unknown after a transport error or timeout; drop it.
+                    slot.conn.close()
+                    slot.conn = None
+                    if not (reused and attempt == 0 and isinstance(e, ConnectionError)):
+                        raise
+
+    def close(self):
+        with self.lock:
+            slots = list(self.slots.values())
+            self.slots.clear()
+        for slot in slots:
+            with slot.lock:
+                if slot.conn:
+                    slot.conn.close()
+                    slot.conn = None
@@ -1,30 +1,48 @@
-import time
+import threading, time
+from functools import partial
 from typing import Dict, Any, Optional
 
+from devicerouter import trace
 from devicerouter.transports.vsock import VsockClient
+from devicerouter.capture import CaptureWriter
+from devicerouter.host.executor import Executor, NullExecutor, DeviceQueue, PartialOpError
 
 class HostService:
-    def __init__(self, schema: Dict[str, Any], guest_cid: int, guest_port: int, ack_delay: float = 0.0):
+    def __init__(self, schema: Dict[str, Any], guest_cid: int, guest_port: int, ack_delay: float = 0.0,
+                 capture: Optional[CaptureWriter] = None,
+                 executor: Optional[Executor] = None, max_concurrency: int = 4):
         # schema = {"devices":{...}, "current-mount":{...}}
         self.schema = schema
         self.client = VsockClient(
             guest_cid=guest_cid, guest_port=guest_port,
-            on_message=self.on_msg, on_connect=self.on_connect, on_disconnect=self.on_disconnect
+            on_message=self.on_msg, on_connect=self.on_connect, on_disconnect=self.on_disconnect,
+            capture=capture
         )
         self.ack_delay = ack_delay
         self.connected = False
+        # Operations run off the reader thread: bounded overall, strictly ordered per device.
+        self.executor = executor or NullExecutor()
+        self.jobs = DeviceQueue(max_workers=max_concurrency)
+        self.mount_lock = threading.Lock()
+        self.stopped = False
 
     def start(self):
         self.client.start()
 
     def stop(self):
+        self.stopped = True
         self.client.stop()
+        # Let running operations finish before their QMP sockets go away.
+        self.jobs.shutdown()
+        self.executor.close()
 
     def on_connect(self):
         self.connected = True
         print("[HOST] Connected to GUI VM")
         # Send snapshot as-is
-        snap = {"type": "snapshot", "devices": self.schema["devices"], "current-mount": self.schema["current-mount"], "ts": time.time()}
+        with self.mount_lock:
+            mounts = dict(self.schema["current-mount"])
+        snap = {"type": "snapshot", "devices": self.schema["devices"], "current-mount": mounts, "ts": time.time()}
         self.client.send(snap)
         print("[HOST] Sent snapshot containing", len(self.schema["devices"]), "devices.")
 
@@ -34,25 +52,78 @@ class HostService:
         self.connected = False
 
     def on_msg(self, msg: Dict[str, Any]):
+        if self.stopped:
+            return
         t = msg.get("type")
-        if t in ("selection", "connect_change"):
-            req_id = msg.get("request_id")
-            device_id = msg.get("device_id")
-            target_vm = msg.get("target_vm")
-            dev_meta = self.schema["devices"].get(device_id, {})
-            permitted = dev_meta.get("permitted_vms", [])
-            ok = target_vm in permitted
-            if self.ack_delay > 0:
-                time.sleep(self.ack_delay)
-            ack = {
-                "type": "ack",
-                "request_id": req_id,
-                "status": "ok" if ok else "error",
-                "message": "" if ok else f"Target '{target_vm}' not permitted for '{device_id}'",
-                "ts": time.time()
-            }
+        with trace.span("host.on_msg", type=t, request_id=msg.get("request_id")):
+            if t in ("selection", "connect_change", "detach"):
+                device_id = msg.get("device_id")
+                self.jobs.submit(device_id, partial(self._run_request, t, msg.get("request_id"), device_id, msg.get("target_vm")))
+            else:
+                print(f"[HOST] unknown msg: {msg}")
+
+    # ---- executor jobs (worker threads) ----
+    def _run_request(self, t: str, req_id: str, device_id: str, target_vm: Optional[str]):
+        if self.ack_delay > 0:
+            time.sleep(self.ack_delay)
+        op, status, message = "none", "ok", ""
+        t0 = time.perf_counter()
+        with trace.span("host.execute", request_id=req_id, device_id=device_id) as sp:
+            try:
+                op = self._apply(t, device_id, target_vm)
+            except Exception as e:
+                status, message = "error", str(e) or e.__class__.__name__
+                if isinstance(e, PartialOpError):
+                    op = e.op
+            sp.set(op=op, status=status)
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        with self.mount_lock:
+            mounted = self.schema["current-mount"].get(device_id)
+        ack = {
+            "type": "ack",
+            "request_id": req_id,
+            "status": status,
+            "message": message,
+            "device_id": device_id,
+            "mounted": mounted,  # where the device is now, whatever the status
+            "op": op,
+            "elapsed_ms": round(elapsed_ms, 3),
+            "ts": time.time()
+        }
+        with trace.span("host.ack_send", request_id=req_id):
             self.client.send(ack)
-            print(f"[HOST] {t} {device_id} -> {target_vm} :: {ack['status']}")
-        else:
-            print(f"[HOST] unknown msg: {msg}")
+        print(f"[HOST] {t} {device_id} -> {target_vm} :: {status} ({op}, {elapsed_ms:.1f} ms)")
+
+    def _apply(self, t: str, device_id: str, target_vm: Optional[str]) -> str:
+        # Ordering per device guarantees nobody else touches this device's mount meanwhile.
+        with self.mount_lock:
+            src = self.schema["current-mount"].get(device_id)
+        try:
+            if t == "detach":
+                if not src:
+                    return "none"
+                self.executor.detach(device_id, src)
+                op, dst = "detach", None
+            else:
+                permitted = self.schema["devices"].get(device_id, {}).get("permitted_vms", [])
+                if target_vm not in permitted:
+                    raise ValueError(f"Target '{target_vm}' not permitted for '{device_id}'")
+                if src == target_vm:
+                    return "none"
+                if src:
+                    self.executor.move(device_id, src, target_vm)
+                    op = "move"
+                else:
+                    self.executor.attach(device_id, target_vm)
+                    op = "attach"
+                dst = target_vm
+        except PartialOpError as e:
+            # Record where the device really is before the error ack goes out.
+            self._set_mount(device_id, e.mounted)
+            raise
+        self._set_mount(device_id, dst)
+        return op
 
+    def _set_mount(self, device_id: str, vm: Optional[str]):
+        with self.mount_lock:
+            self.schema["current-mount"][device_id] = vm
@@ -0,0 +1,108 @@
+import cProfile, io, os, pstats, sys, threading, time
+from collections import Counter
+from typing import Optional
+
+from devicerouter import trace
+
+class Profiler:
+    """
+    Profiles for a fixed number of seconds.
+    - "cprofile": deterministic, main thread only (the Qt event loop of the GUI in
+      test-file mode); writes a .prof file (pstats / snakeviz) and prints the top functions.
+    - "sample": samples every thread's stack each `interval` s; writes folded stacks
+      ("a;b;c N" lines) for flamegraph.pl / speedscope. The only mode wherever messages
+      are handled off the main thread: the host and the GUI in vsock mode.
+    stop() must be called from the thread that called start() for "cprofile".
+    """
+    def __init__(self, mode: str, seconds: float, out: str, interval: float = 0.005):
+        self.mode = mode
+        self.seconds = seconds
+        self.out = out
+        self.interval = interval
+        self.deadline = 0.0
+        self.running = False
+        self._prof: Optional[cProfile.Profile] = None
+        self._stacks: Counter = Counter()
+        self._stop_flag = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        self.deadline = time.monotonic() + self.seconds
+        self.running = True
+        if self.mode == "cprofile":
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        else:
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+        print(f"[PROFILE] {self.mode} for {self.seconds:g}s -> {self.out}")
+
+    def due(self) -> bool:
+        return self.running and time.monotonic() >= self.deadline
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self._prof:
+            self._prof.disable()
+            self._prof.dump_stats(self.out)
+            s = io.StringIO()
+            pstats.Stats(self._prof, stream=s).sort_stats("cumulative").print_stats(20)
+            print(s.getvalue())
+        else:
+            self._stop_flag.set()
+            if self._sampler:
+                self._sampler.join()
+            with open(self.out, "w") as f:
+                for stack, n in self._stacks.most_common():
+                    f.write(f"{stack} {n}\n")
+        print(f"[PROFILE] wrote {self.out}")
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop_flag.is_set() and time.monotonic() < self.deadline:
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                parts.append(names.get(tid, str(tid)))
+                self._stacks[";".join(reversed(parts))] += 1
+            time.sleep(self.interval)
+
+
+# ---- CLI wiring shared by devicerouter-host and devicerouter-gui ----
+def add_trace_args(p):
+    p.add_argument("--trace", type=str, default=os.environ.get("DEVICEROUTER_TRACE"),
+                   help="Stream Chrome trace-event JSON to this file (env DEVICEROUTER_TRACE)")
+    p.add_argument("--profile", choices=["cprofile", "sample"], default=os.environ.get("DEVICEROUTER_PROFILE"),
+                   help="Profile for --profile-seconds (env DEVICEROUTER_PROFILE)")
+    p.add_argument("--profile-seconds", type=float,
+                   default=float(os.environ.get("DEVICEROUTER_PROFILE_SECONDS", "30")),
+                   help="Profiling duration (default 30, env DEVICEROUTER_PROFILE_SECONDS)")
+    p.add_argument("--profile-out", type=str, help="Profile output file (default devicerouter-<role>-<pid>.prof/.folded)")
+
+def start_from_args(args, role: str, threaded: bool = False) -> Optional[Profiler]:
+    """
+    Enables tracing and starts the profiler as requested; returns the profiler to stop later.
+    threaded: the work runs off the main thread, where cprofile would see nothing.
+    """
+    if args.profile == "cprofile" and threaded:
+        raise SystemExit(f"--profile cprofile only sees the main thread, but the {role} handles messages "
+                         "on other threads here; use --profile sample")
+    if args.trace:
+        trace.enable(args.trace, process_name=f"devicerouter-{role}")
+    if not args.profile:
+        return None
+    ext = "prof" if args.profile == "cprofile" else "folded"
+    out = args.profile_out or f"devicerouter-{role}-{os.getpid()}.{ext}"
+    prof = Profiler(args.profile, args.profile_seconds, out)
+    prof.start()
+    return prof
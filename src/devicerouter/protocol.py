@@ -2,9 +2,13 @@ import json
 import socket
 from typing import Dict, Any, Generator
 
+from devicerouter import trace
+
 def jsonl_send(sock: socket.socket, obj: Dict[str, Any]) -> None:
-    data = (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
-    sock.sendall(data)
+    sp = trace.span("send", type=obj.get("type"), request_id=obj.get("request_id")) if trace.ENABLED else trace.NOOP
+    with sp:
+        data = (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
+        sock.sendall(data)
 
 def jsonl_reader(sock: socket.socket) -> Generator[Dict[str, Any], None, None]:
     buf = b""
@@ -16,13 +20,23 @@ def jsonl_reader(sock: socket.socket) -> Generator[Dict[str, Any], None, None]:
         while b"\n" in buf:
             line, buf = buf.split(b"\n", 1)
             line = line.strip()
-            if line:
-                yield json.loads(line.decode("utf-8"))
+            if not line:
+                continue
+            sp = trace.span("decode", bytes=len(line)) if trace.ENABLED else trace.NOOP
+            with sp:
+                msg = json.loads(line.decode("utf-8"))
+                if trace.ENABLED:
+                    sp.set(type=msg.get("type"), request_id=msg.get("request_id"))
+            yield msg
 
 # Message types (documentation)
 # - snapshot: {"type":"snapshot","devices":{...},"current-mount":{...}}
 # - selection: {"type":"selection","request_id":"...","device_id":"vid:pid","target_vm":"..."}
 # - connect_change: same as selection but for changes
-# - ack: {"type":"ack","request_id":"...","status":"ok"|"error","message":"", ...}
+# - detach: {"type":"detach","request_id":"...","device_id":"vid:pid"}
+# - ack: {"type":"ack","request_id":"...","status":"ok"|"error","message":"",
+#         "device_id":"vid:pid","mounted":"vm"|null,
+#         "op":"attach"|"detach"|"move"|"none","elapsed_ms":12.3, ...}
+#   "mounted" is authoritative even for errors and for acks the GUI already timed out on.
 # - device_removed: {"type":"device_removed","device_id":"vid:pid"}
 
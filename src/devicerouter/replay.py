@@ -0,0 +1,122 @@
+import copy, json, os, tempfile, time
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from devicerouter.capture import read_capture
+
+Frame = Tuple[float, Dict[str, Any]]  # (seconds since previous frame, msg)
+
+class _Sink:
+    """Stands in for the transport of the replay target; keeps what it would have sent."""
+    def __init__(self):
+        self.sent: List[Dict[str, Any]] = []
+
+    def send(self, obj: Dict[str, Any]):
+        self.sent.append(obj)
+
+    def stop(self):
+        pass
+
+
+def load_frames(path, target: str) -> List[Frame]:
+    """
+    Frames the given target ("host" or "gui") would have received.
+    A capture recorded on the same side contributes its "in" frames; one recorded
+    on the other side contributes its "out" frames. Gaps restart at each session header.
+    """
+    frames: List[Frame] = []
+    role = None
+    prev_t: Optional[float] = None
+    for rec in read_capture(path):
+        if "capture" in rec:
+            role = rec.get("role")
+            prev_t = None
+            continue
+        want = "in" if role == target else "out"
+        if rec.get("d") != want:
+            continue
+        t = rec.get("t", 0.0)
+        gap = 0.0 if prev_t is None else max(0.0, t - prev_t)
+        prev_t = t
+        frames.append((gap, rec.get("msg") or {}))
+    return frames
+
+
+def first_snapshot(path) -> Optional[Dict[str, Any]]:
+    for rec in read_capture(path):
+        msg = rec.get("msg") or {}
+        if msg.get("type") == "snapshot":
+            return {"devices": msg.get("devices", {}), "current-mount": msg.get("current-mount", {})}
+    return None
+
+
+def replay(frames: List[Frame], handler: Callable[[Dict[str, Any]], None],
+           speed: float = 1.0) -> Dict[str, List[float]]:
+    """
+    Feeds frames to handler. speed=1 keeps the recorded pacing, N is N times faster,
+    0 means as fast as possible. Returns msg type -> handler durations (seconds).
+    """
+    stats: Dict[str, List[float]] = {}
+    start = time.monotonic()
+    due = 0.0
+    for gap, msg in frames:
+        if speed > 0:
+            due += gap / speed
+            wait = start + due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        t0 = time.perf_counter()
+        handler(msg)
+        stats.setdefault(msg.get("type") or "?", []).append(time.perf_counter() - t0)
+    return stats
+
+
+def format_report(stats: Dict[str, List[float]]) -> str:
+    rows = [f"{'type':<16}{'count':>8}{'total ms':>12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+    for t in sorted(stats):
+        d = sorted(stats[t])
+        n = len(d)
+        p = lambda q: d[min(n - 1, int(q * n))] * 1000.0
+        rows.append(f"{t:<16}{n:>8}{sum(d)*1000.0:>12.3f}{sum(d)/n*1000.0:>10.3f}"
+                    f"{p(0.50):>10.3f}{p(0.95):>10.3f}{d[-1]*1000.0:>10.3f}")
+    return "\n".join(rows)
+
+
+# ---- targets ----
+class HostTarget:
+    """
+    HostService without vsock, on a private copy of schema (the service updates
+    current-mount), so every replay pass starts from the same state.
+    Each message is timed until its device operation has acked.
+    close() stops the workers but leaves the executor open for the next pass.
+    """
+    def __init__(self, schema: Dict[str, Any], executor=None, max_concurrency: int = 4):
+        from devicerouter.host.service import HostService
+        self.svc = HostService(copy.deepcopy(schema), guest_cid=0, guest_port=0,
+                               executor=executor, max_concurrency=max_concurrency)
+        self.svc.client = _Sink()  # never started; acks land in the sink
+
+    def __call__(self, msg: Dict[str, Any]):
+        self.svc.on_msg(msg)
+        self.svc.jobs.wait_idle()
+
+    def close(self):
+        self.svc.jobs.shutdown()
+
+
+def gui_target() -> Callable[[Dict[str, Any]], None]:
+    """Headless App (offscreen Qt). Pending Qt events are processed inside the timing."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from devicerouter.gui.app_qt5 import App
+
+    qapp = QApplication.instance() or QApplication([])
+    tmp = Path(tempfile.mkdtemp(prefix="devicerouter-replay-")) / "schema.json"
+    tmp.write_text(json.dumps({"devices": {}, "current-mount": {}}))
+    w = App(use_file_transport=True, my_port=0, test_file=tmp, combo_width=None, popup_width=None)
+    w.show()
+
+    def handle(msg: Dict[str, Any]):
+        w.on_msg(msg)
+        qapp.processEvents()
+    return handle
@@ -0,0 +1,114 @@
+import atexit, json, os, threading, time
+from typing import Dict, Any, Optional, TextIO
+
+# Opt-in tracing, exported as Chrome trace-event JSON (chrome://tracing, Perfetto).
+# While disabled, span() hands back one shared no-op object, so a hook costs a call and a flag check;
+# per-frame paths (protocol.py) test ENABLED first and skip even that.
+ENABLED = False
+
+_lock = threading.Lock()
+_file: Optional[TextIO] = None
+_count = 0
+_pid = os.getpid()
+# Wall-clock based timestamps so host and GUI traces can be loaded side by side.
+_epoch = time.time() - time.perf_counter()
+
+
+def _now_us() -> float:
+    return (time.perf_counter() + _epoch) * 1e6
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+# Shared no-op span; hot paths use it directly when ENABLED is False.
+NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "t0")
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = _now_us()
+        _emit({"name": self.name, "cat": "devicerouter", "ph": "X", "ts": self.t0, "dur": t1 - self.t0,
+               "pid": _pid, "tid": threading.get_ident(), "args": self.args})
+        return False
+
+    def set(self, **args):
+        """Attach args learned inside the span (e.g. the request_id after decoding)."""
+        self.args.update(args)
+
+
+def span(name: str, **args):
+    """with span("host.on_msg", request_id=rid): ... -- args end up in the trace event."""
+    if not ENABLED:
+        return NOOP
+    return _Span(name, args)
+
+
+def request_begin(request_id: str, **args) -> None:
+    """Start of a request's end-to-end async slice (id = request_id)."""
+    if ENABLED:
+        _emit({"name": "request", "cat": "request", "ph": "b", "id": request_id, "ts": _now_us(),
+               "pid": _pid, "tid": threading.get_ident(), "args": dict(args, request_id=request_id)})
+
+
+def request_end(request_id: str, **args) -> None:
+    if ENABLED:
+        _emit({"name": "request", "cat": "request", "ph": "e", "id": request_id, "ts": _now_us(),
+               "pid": _pid, "tid": threading.get_ident(), "args": args})
+
+
+def enable(path: str, process_name: str) -> None:
+    """
+    Start collecting. Events are streamed to path (JSON array format, buffered),
+    so memory stays flat however long the run; close() at exit writes the closing "]".
+    A file cut short by a crash still loads in chrome://tracing and Perfetto.
+    """
+    global ENABLED, _file, _count
+    _file = open(path, "w")
+    _file.write("[\n")
+    _count = 0
+    _emit({"name": "process_name", "ph": "M", "pid": _pid, "tid": 0, "args": {"name": process_name}})
+    ENABLED = True
+    atexit.register(close)
+
+
+def close() -> None:
+    global ENABLED, _file
+    with _lock:
+        if _file is None:
+            return
+        ENABLED = False
+        _file.write("\n]\n")
+        _file.close()
+        print(f"[TRACE] wrote {_count} events to {_file.name}")
+        _file = None
+
+
+def _emit(ev: Dict[str, Any]) -> None:
+    global _count
+    line = json.dumps(ev, separators=(",", ":"))
+    with _lock:
+        if _file is None:
+            return
+        _file.write(line if _count == 0 else ",\n" + line)
+        _count += 1
@@ -5,6 +5,7 @@ from pathlib import Path
 from PyQt5.QtCore import QTimer, QObject
 
 from devicerouter.schema import normalize_schema
+from devicerouter.capture import CaptureWriter
 
 class FileTestTransport(QObject):
     """
@@ -14,9 +15,12 @@ class FileTestTransport(QObject):
     - sync_from_registry() writes the current GUI-connected state into "current-mount".
     """
     def __init__(self, path: Path,
-                 emit_message, emit_connected, emit_disconnected, emit_ack):
+                 emit_message, emit_connected, emit_disconnected, emit_ack,
+                 capture: Optional[CaptureWriter] = None):
         super().__init__()
         self.path = path
+        self.capture = capture
+        self.peer = f"file:{path}"
         self.emit_message = emit_message
         self.emit_connected = emit_connected
         self.emit_disconnected = emit_disconnected
@@ -41,8 +45,13 @@ class FileTestTransport(QObject):
 
     def send(self, obj: Dict[str, Any]):
         # Simulate immediate ACK ok
+        if self.capture:
+            self.capture.record("out", self.peer, obj)
         t = obj.get("type")
         if t in ("selection", "connect_change"):
+            if self.capture:
+                self.capture.record("in", self.peer, {"type": "ack", "request_id": obj.get("request_id",""),
+                                                      "status": "ok", "message": "", "ts": time.time()})
             self.emit_ack(obj.get("request_id",""), "ok", "")
 
     def sync_from_registry(self, reg_devices: Dict[str, Dict[str, Any]]):
@@ -72,6 +81,8 @@ class FileTestTransport(QObject):
     def _emit_snapshot_from_file(self, initial=False):
         doc = normalize_schema(self._read_doc())
         payload = {"type": "snapshot", "devices": doc["devices"], "current-mount": doc["current-mount"], "ts": time.time()}
+        if self.capture:
+            self.capture.record("in", self.peer, payload)
         self.emit_message(payload)
         if initial:
             try:
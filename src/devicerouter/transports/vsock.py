@@ -1,6 +1,7 @@
 import socket, time, threading
 from typing import Callable, Dict, Any, Optional
 from devicerouter.protocol import jsonl_reader, jsonl_send
+from devicerouter.capture import CaptureWriter
 
 AF_VSOCK = getattr(socket, "AF_VSOCK", None)
 SOCK_STREAM = socket.SOCK_STREAM
@@ -10,14 +11,17 @@ class VsockServer(threading.Thread):
     def __init__(self, on_message: Callable[[Dict[str, Any]], None],
                  on_connect: Callable[[], None],
                  on_disconnect: Callable[[], None],
-                 my_port: int):
+                 my_port: int,
+                 capture: Optional[CaptureWriter] = None):
         super().__init__(daemon=True)
         self.on_message = on_message
         self.on_connect = on_connect
         self.on_disconnect = on_disconnect
         self.my_port = my_port
+        self.capture = capture
         self.sock: Optional[socket.socket] = None
         self.client: Optional[socket.socket] = None
+        self.peer = ""
         self.stop_flag = threading.Event()
 
     def run(self):
@@ -32,9 +36,12 @@ class VsockServer(threading.Thread):
                 self.sock.settimeout(1.0)
                 while not self.stop_flag.is_set():
                     try:
-                        self.client, _ = self.sock.accept()
+                        self.client, addr = self.sock.accept()
+                        self.peer = "vsock:%s:%s" % addr
                         self.on_connect()
                         for msg in jsonl_reader(self.client):
+                            if self.capture:
+                                self.capture.record("in", self.peer, msg)
                             self.on_message(msg)
                     except socket.timeout:
                         continue
@@ -56,6 +63,8 @@ class VsockServer(threading.Thread):
     def send(self, obj: Dict[str, Any]):
         if not self.client:
             raise RuntimeError("No host connected")
+        if self.capture:
+            self.capture.record("out", self.peer, obj)
         jsonl_send(self.client, obj)
 
     def stop(self):
@@ -73,13 +82,16 @@ class VsockClient(threading.Thread):
     def __init__(self, guest_cid: int, guest_port: int,
                  on_message: Callable[[Dict[str, Any]], None],
                  on_connect: Callable[[], None],
-                 on_disconnect: Callable[[], None]):
+                 on_disconnect: Callable[[], None],
+                 capture: Optional[CaptureWriter] = None):
         super().__init__(daemon=True)
         self.guest_cid = guest_cid
         self.guest_port = guest_port
         self.on_message = on_message
         self.on_connect = on_connect
         self.on_disconnect = on_disconnect
+        self.capture = capture
+        self.peer = f"vsock:{guest_cid}:{guest_port}"
         self.stop_flag = threading.Event()
         self.sock: Optional[socket.socket] = None
         self.lock = threading.Lock()
@@ -97,6 +109,8 @@ class VsockClient(threading.Thread):
                 self.sock = s
                 self.on_connect()
                 for msg in jsonl_reader(s):
+                    if self.capture:
+                        self.capture.record("in", self.peer, msg)
                     self.on_message(msg)
             except Exception:
                 self.on_disconnect()
@@ -111,6 +125,8 @@ class VsockClient(threading.Thread):
         with self.lock:
             if not self.sock:
                 raise RuntimeError("Not connected to GUI VM")
+            if self.capture:
+                self.capture.record("out", self.peer, obj)
             jsonl_send(self.sock, obj)
 
     def stop(self):
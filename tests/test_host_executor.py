@@ -0,0 +1,152 @@
+import threading, time
+
+import pytest
+
+from devicerouter.host.executor import DeviceQueue, Executor, PartialOpError, QmpExecutor, qdev_id
+from devicerouter.host.fakeqmp import start_fake_fleet
+from devicerouter.host.service import HostService
+
+DEV = "1a86:7523"
+QID = qdev_id(DEV)
+
+
+class Sink:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, obj):
+        self.sent.append(obj)
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def fleet():
+    template, servers = start_fake_fleet(["vm1", "vm2", "vm3"])
+    yield template, {s.path.rsplit("/", 1)[-1][:-len(".qmp")]: s for s in servers}
+    for s in servers:
+        s.stop()
+
+
+def make_service(template, mounted=None, **kw):
+    schema = {"devices": {DEV: {"permitted_vms": ["vm1", "vm2", "vm3"]}}, "current-mount": {DEV: mounted}}
+    svc = HostService(schema, 0, 0, executor=QmpExecutor(template, **kw))
+    svc.client = Sink()
+    return svc
+
+
+def request(svc, t, target_vm=None, req_id="r"):
+    svc.on_msg({"type": t, "request_id": req_id, "device_id": DEV, "target_vm": target_vm})
+    assert svc.jobs.wait_idle(5)
+    return svc.client.sent[-1]
+
+
+def test_attach_move_detach(fleet):
+    template, vms = fleet
+    svc = make_service(template)
+    ack = request(svc, "selection", "vm1")
+    assert (ack["status"], ack["op"], ack["mounted"]) == ("ok", "attach", "vm1")
+    assert QID in vms["vm1"].devices
+    ack = request(svc, "connect_change", "vm2")
+    assert (ack["status"], ack["op"], ack["mounted"]) == ("ok", "move", "vm2")
+    assert QID not in vms["vm1"].devices and QID in vms["vm2"].devices
+    ack = request(svc, "detach")
+    assert (ack["status"], ack["op"], ack["mounted"]) == ("ok", "detach", None)
+    assert not any(QID in s.devices for s in vms.values())
+    assert svc.schema["current-mount"][DEV] is None
+    svc.stop()
+
+
+def test_not_permitted_changes_nothing(fleet):
+    template, vms = fleet
+    svc = make_service(template, mounted="vm1")
+    vms["vm1"].devices[QID] = {}
+    ack = request(svc, "selection", "vm9")
+    assert (ack["status"], ack["op"], ack["mounted"]) == ("error", "none", "vm1")
+    assert QID in vms["vm1"].devices
+    svc.stop()
+
+
+def test_failed_move_rolls_back_to_source(fleet):
+    template, vms = fleet
+    svc = make_service(template, mounted="vm1")
+    vms["vm1"].devices[QID] = {}
+    vms["vm2"].devices[QID] = {}  # device_add on vm2 fails with "Duplicate device ID"
+    ack = request(svc, "connect_change", "vm2")
+    assert ack["status"] == "error" and "restored" in ack["message"]
+    assert (ack["op"], ack["mounted"]) == ("none", "vm1")
+    assert QID in vms["vm1"].devices
+    assert svc.schema["current-mount"][DEV] == "vm1"
+    svc.stop()
+
+
+def test_detach_timeout_records_device_as_detached(fleet):
+    template, vms = fleet
+    svc = make_service(template, mounted="vm1", detach_timeout=0.2)
+    vms["vm1"].devices[QID] = {}
+    vms["vm1"]._deleted_later = lambda *a: None  # DEVICE_DELETED never arrives
+    ack = request(svc, "detach")
+    assert (ack["status"], ack["op"], ack["mounted"]) == ("error", "detach", None)
+    assert svc.schema["current-mount"][DEV] is None
+    svc.stop()
+
+
+class _FailingAttach(Executor):
+    def __init__(self, failing):
+        self.failing = failing
+        self.calls = []
+
+    def attach(self, device_id, vm):
+        self.calls.append(("attach", vm))
+        if vm in self.failing:
+            raise RuntimeError(f"no {vm}")
+
+    def detach(self, device_id, vm):
+        self.calls.append(("detach", vm))
+
+
+def test_move_reports_detached_when_rollback_fails():
+    ex = _FailingAttach({"vm1", "vm2"})
+    with pytest.raises(PartialOpError) as info:
+        ex.move(DEV, "vm1", "vm2")
+    assert (info.value.op, info.value.mounted) == ("detach", None)
+    assert ex.calls == [("detach", "vm1"), ("attach", "vm2"), ("attach", "vm1")]
+
+
+def test_device_queue_orders_per_key_and_runs_keys_in_parallel():
+    q = DeviceQueue(max_workers=4)
+    out = {"a": [], "b": []}
+    running = set()
+    overlap = threading.Event()
+    lock = threading.Lock()
+
+    def job(key, i):
+        with lock:
+            running.add(key)
+            if len(running) > 1:
+                overlap.set()
+        time.sleep(0.005)
+        with lock:
+            running.discard(key)
+        out[key].append(i)
+
+    for i in range(20):
+        q.submit("a", lambda i=i: job("a", i))
+        q.submit("b", lambda i=i: job("b", i))
+    assert q.wait_idle(5)
+    assert out == {"a": list(range(20)), "b": list(range(20))}
+    assert overlap.is_set()
+    q.shutdown()
+
+
+def test_device_queue_shutdown_drops_queued_jobs():
+    q = DeviceQueue(max_workers=1)
+    ran = []
+    for i in range(5):
+        q.submit("a", lambda i=i: (time.sleep(0.05), ran.append(i)))
+    time.sleep(0.01)
+    q.shutdown()
+    assert ran == [0]
+    assert q.wait_idle(1)
+    assert q.submit("a", lambda: ran.append("late")) is False